@@ -5,9 +5,16 @@ import os
 # Ensure correct path resolution for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
+from src import get_llm, get_retriever
 from src.rag import run_rag
 
 
+@st.cache_data(show_spinner=False, ttl=3600)
+def cached_run_rag(query: str) -> str:
+    """Cache answers per query so repeated searches skip retrieval and generation"""
+    return run_rag(query)
+
+
 def main():
     st.set_page_config(page_title="HackerNews RAG", page_icon="🔎")
 
@@ -16,6 +23,9 @@ def main():
     # Add cache clear button for debugging
     if st.button("Clear Cache"):
         st.cache_data.clear()
+        # Also drop the process-wide model and vector store so they are reloaded
+        get_llm.cache_clear()
+        get_retriever.cache_clear()
         st.rerun()
 
     st.write("Ask a question about HackerNews data:")
@@ -29,7 +39,7 @@ def main():
                 #st.write(f"🔍 Query: `{query}`")
                 
                 try:
-                    answer = run_rag(query)
+                    answer = cached_run_rag(query)
                     st.success(f"✅ Answer: {answer}")
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
@@ -1,38 +1,54 @@
-import math
 import re
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
+from scipy.sparse.linalg import norm as sparse_norm
+from sklearn.feature_extraction.text import CountVectorizer
 
+from src import get_llm, get_retriever
 from src.rag import run_rag
 
+MAX_WORKERS = 8  # Number of RAG queries in flight at once
+PUNCT_RE = re.compile(r"[^\w\s]")
 
-def cosine_similarity(text1, text2):
-    """Calculate cosine similarity between two texts"""
-    text1, text2 = [re.sub(r"[^\w\s]", "", t.lower()).split() for t in [text1, text2]]
-    if not text1 or not text2:
-        return 0.0
 
-    all_words = set(text1 + text2)
-    freq1, freq2 = Counter(text1), Counter(text2)
-    vector1 = [freq1.get(word, 0) for word in all_words]
-    vector2 = [freq2.get(word, 0) for word in all_words]
+def tokenize(text):
+    """Lowercase, strip punctuation and split text into words"""
+    return PUNCT_RE.sub("", text.lower()).split()
 
-    dot_product = sum(a * b for a, b in zip(vector1, vector2))
-    magnitude1 = math.sqrt(sum(a * a for a in vector1))
-    magnitude2 = math.sqrt(sum(b * b for b in vector2))
 
-    return 0.0 if magnitude1 == 0 or magnitude2 == 0 else dot_product / (magnitude1 * magnitude2)
+def cosine_scores(references, answers):
+    """Row-wise bag-of-words cosine similarity between two aligned lists of texts"""
+    try:
+        vectorizer = CountVectorizer(analyzer=tokenize).fit(list(references) + list(answers))
+    except ValueError:
+        # Every text tokenized to nothing ("empty vocabulary"), so no pair has any words in common
+        return np.zeros(len(references))
+    ref_vectors, answer_vectors = vectorizer.transform(references), vectorizer.transform(answers)
 
+    dot_products = np.asarray(ref_vectors.multiply(answer_vectors).sum(axis=1), dtype=float).ravel()
+    magnitudes = sparse_norm(ref_vectors, axis=1) * sparse_norm(answer_vectors, axis=1)
 
-df = pd.read_csv("src/data/evaluate.csv")
+    return np.divide(dot_products, magnitudes, out=np.zeros_like(dot_products), where=magnitudes != 0)
 
-for i, row in df.iterrows():
-    question = row["Question"]
-    rag_answer = run_rag(question)
-    df.at[i, "rag_answer"] = rag_answer
-    df.at[i, "score"] = round(cosine_similarity(row["Answer"], rag_answer), 4)
-    print(f"Processed {i + 1}/{len(df)}: {question[:50]}...")
+
+def run_rag_batch(questions, max_workers=MAX_WORKERS):
+    """Run RAG for all questions concurrently, answering duplicate questions only once"""
+    unique_questions = list(dict.fromkeys(questions))
+    # Build the shared LLM and retriever up front so worker threads don't race to create them
+    get_llm(), get_retriever()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        answers = dict(zip(unique_questions, executor.map(run_rag, unique_questions)))
+    return [answers[q] for q in questions]
+
+
+df = pd.read_csv("src/data/evaluate.csv", usecols=["Question", "Answer"], dtype={"Question": "string", "Answer": "string"})
+
+df["rag_answer"] = run_rag_batch(df["Question"].tolist())
+print(f"Processed {len(df)} questions")
+
+df["score"] = np.round(cosine_scores(df["Answer"], df["rag_answer"]), 4)
 
 df.to_csv("src/data/evaluate_results.csv", index=False)
 print("Done! Results saved to src/data/evaluate_results.csv")
@@ -1,12 +1,103 @@
 # endpoints.py
+import asyncio
+import random
+
 import aiohttp
+import ijson
+
+from . import fast_json
+from .rate_limiter import AdaptiveLimiter
+
+# Identify the client to the HN API; aiohttp already requests gzip/deflate responses by default
+DEFAULT_HEADERS = {"User-Agent": "hackernews-rag/0.1"}
+
+# Story ID list endpoint per HN category
+CATEGORY_ENDPOINTS = {
+    "topstories": "https://hacker-news.firebaseio.com/v0/topstories.json",
+    "newstories": "https://hacker-news.firebaseio.com/v0/newstories.json",
+    "beststories": "https://hacker-news.firebaseio.com/v0/beststories.json",
+    "askstories": "https://hacker-news.firebaseio.com/v0/askstories.json",
+    "showstories": "https://hacker-news.firebaseio.com/v0/showstories.json",
+    "jobstories": "https://hacker-news.firebaseio.com/v0/jobstories.json",
+}
 
 
 class Endpoints:
+    def __init__(self, connection_limit=32, max_retries=3):
+        self.connection_limit = connection_limit  # Max open connections to the HN API
+        self.max_retries = max_retries  # Retries per request on network errors, timeouts and HTTP errors
+        self._session = None
+        self._limiter = None
+
+    async def get_session(self):
+        """Lazily create the shared session, tuned for many small requests to a single host"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=self.connection_limit,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True,
+            )
+            # Bound each request so a stalled connection can't hang the whole run
+            timeout = aiohttp.ClientTimeout(total=30)
+            self._session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS, timeout=timeout)
+        return self._session
+
+    async def close_session(self):
+        """Close the shared session, if one was opened"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._limiter = None
+
+    def get_limiter(self):
+        """Lazily create the adaptive limiter inside the running event loop"""
+        if self._limiter is None:
+            self._limiter = AdaptiveLimiter(max_limit=self.connection_limit)
+        return self._limiter
+
+    async def request(self, session, url, read):
+        """GET url and return await read(response), with concurrency adapted to the API's response times and retries with backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.get_limiter().use():
+                    async with session.get(url) as response:
+                        response.raise_for_status()  # Count 429s and other errors as failures so the limiter backs off
+                        return await read(response)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            # Exponential backoff with jitter, waiting outside the limiter so other requests keep flowing
+            await asyncio.sleep(0.2 * 2**attempt + random.uniform(0, 0.1))
+
     async def fetch_json(self, session, url):
         """Fetch JSON from URL"""
-        async with session.get(url) as response:
-            return await response.json()
+
+        async def read(response):
+            # Parse the raw body with orjson rather than aiohttp's stdlib-json response.json()
+            return fast_json.loads(await response.read())
+
+        return await self.request(session, url, read)
+
+    async def fetch_id_prefix(self, session, url, limit):
+        """Stream-parse a JSON list of IDs and stop reading once the first `limit` are in"""
+        if limit <= 0:
+            return []
+
+        async def read(response):
+            ids = []  # Fresh per attempt, a retried read starts over
+            async for prefix, event, value in ijson.parse(response.content):
+                if prefix == "item":
+                    ids.append(value)
+                    if len(ids) >= limit:
+                        break
+                elif event not in ("start_array", "end_array"):
+                    # An error object or null body would otherwise look like an empty list
+                    raise ValueError(f"expected a JSON list of IDs, got {event}")
+            return ids
+
+        return await self.request(session, url, read)
 
     # used for fetching comment and story data from HN API
     async def get_item(self, session, item_id):
@@ -18,24 +109,17 @@ class Endpoints:
         return await self.fetch_json(session, f"https://hacker-news.firebaseio.com/v0/user/{username}.json")
 
     # used for fetchign story IDs from various HN endpoints with number of stories per category
-    async def get_all_stories(self, stories_per_category=5):
+    async def get_all_stories(self, stories_per_category=5, session=None):
         """Fetch story IDs from all HN endpoints"""
-        endpoints = {
-            "topstories": "https://hacker-news.firebaseio.com/v0/topstories.json",
-            "newstories": "https://hacker-news.firebaseio.com/v0/newstories.json",
-            "beststories": "https://hacker-news.firebaseio.com/v0/beststories.json",
-            "askstories": "https://hacker-news.firebaseio.com/v0/askstories.json",
-            "showstories": "https://hacker-news.firebaseio.com/v0/showstories.json",
-            "jobstories": "https://hacker-news.firebaseio.com/v0/jobstories.json",
-        }
+        session = session or await self.get_session()
         results = {}
-        async with aiohttp.ClientSession() as session:
-            for category, url in endpoints.items():
-                try:
-                    story_ids = await self.fetch_json(session, url)
-                    results[category] = story_ids[:stories_per_category]
-                    print(f" {category}: {len(results[category])} stories")
-                except Exception as e:
-                    print(f" Error fetching {category}: {e}")
-                    results[category] = []
+        # Fetch all category lists concurrently, errors are returned per category
+        responses = await asyncio.gather(*(self.fetch_id_prefix(session, url, stories_per_category) for url in CATEGORY_ENDPOINTS.values()), return_exceptions=True)
+        for category, story_ids in zip(CATEGORY_ENDPOINTS, responses):
+            if isinstance(story_ids, Exception):
+                print(f" Error fetching {category}: {story_ids}")
+                results[category] = []
+            else:
+                results[category] = story_ids
+                print(f" {category}: {len(results[category])} stories")
         return results
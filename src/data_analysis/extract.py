@@ -3,13 +3,15 @@ HackerNews Data extracter
 Fetches data from HackerNews API with batching, caching, and concurrent processing.
 """
 
+import array
 import asyncio
-import json
+import functools
 import os
 import platform
+import time
+from pathlib import Path
 
-import aiohttp
-
+from . import fast_json
 from .api_endpoints import Endpoints
 
 # Windows-specific asyncio fix for event loop policy issues
@@ -17,6 +19,22 @@ if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
+# format_user previews 10 submissions and marks longer lists with "…", so one more ID keeps its output identical
+CACHED_SUBMITTED_IDS = 11
+
+
+@functools.lru_cache(maxsize=1)
+def find_project_data_path():
+    """Find project data directory by locating pyproject.toml (robust path resolution), unless HN_DATA_DIR is set"""
+    if data_dir := os.environ.get("HN_DATA_DIR"):
+        return data_dir
+    module_path = Path(__file__).resolve()
+    for parent in module_path.parents:
+        if (parent / "pyproject.toml").exists():
+            return str(parent / "src" / "data")
+    return str(module_path.parents[2] / "src" / "data")
+
+
 class Extracter:
     def __init__(
         self,
@@ -25,183 +43,263 @@ class Extracter:
         # Limits for various data fetches
         max_top_comments=5,  # Limit top-level comments to avoid overwhelming the output
         max_child_comments=3,  # Limit child comments to avoid deep recursion
-        batch_size=10,  # Number of items to fetch in each batch
+        batch_size=32,  # Max concurrent requests per fetch, kept in flight continuously
+        connection_limit=32,  # Max open connections to the HN API in the shared HTTP session
+        max_cached_users=10000,  # User profiles kept on disk between runs to avoid refetching frequent posters
+        user_cache_ttl=7 * 24 * 3600,  # Seconds before a cached user profile is refetched (karma and about change)
     ):
         self.stories_per_category = stories_per_category
         self.max_comment_depth = max_comment_depth
         self.max_top_comments = max_top_comments
         self.max_child_comments = max_child_comments
         self.batch_size = batch_size
-        self.ep = Endpoints()
+        self.max_cached_users = max_cached_users
+        self.user_cache_ttl = user_cache_ttl
+        self.ep = Endpoints(connection_limit)
 
     def get_project_data_path(self):
-        """Find project data directory by locating pyproject.toml (robust path resolution)"""
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        while current_dir != os.path.dirname(current_dir):
-            if os.path.exists(os.path.join(current_dir, "pyproject.toml")):
-                return os.path.join(current_dir, "src", "data")
-            current_dir = os.path.dirname(current_dir)
-        return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src", "data")
+        """Project data directory, resolved once per process"""
+        return find_project_data_path()
 
     def load_processed_ids(self):
-        """Load previously processed IDs"""
-        ids_file = os.path.join(self.get_project_data_path(), "processed_ids.json")
-        return set(json.load(open(ids_file))) if os.path.exists(ids_file) else set()
-
-    def save_processed_ids(self, processed_ids):
-        """Save processed IDs to disk"""
+        """Load previously processed item IDs"""
+        data_dir = self.get_project_data_path()
+        ids_file = os.path.join(data_dir, "processed_ids.bin")
+        if os.path.exists(ids_file):
+            ids = array.array("I")
+            assert ids.itemsize == 4, "processed_ids.bin stores 32-bit IDs"
+            with open(ids_file, "rb") as f:
+                data = f.read()
+            # A run that died mid-append can leave a partial ID at the end, drop it rather than fail every later run
+            if partial := len(data) % ids.itemsize:
+                data = data[:-partial]
+                os.truncate(ids_file, len(data))  # Otherwise the next append would misalign every ID after it
+            ids.frombytes(data)
+            return set(ids)
+        # Migrate the JSON format used before processed_ids.bin
+        legacy_file = os.path.join(data_dir, "processed_ids.json")
+        if os.path.exists(legacy_file):
+            with open(legacy_file, "rb") as f:
+                processed_ids = {i for i in fast_json.loads(f.read()) if isinstance(i, int)}
+            self.save_processed_ids(processed_ids)
+            return processed_ids
+        return set()
+
+    def save_processed_ids(self, new_ids):
+        """Append newly processed item IDs to disk as packed 32-bit ints, so each run only writes its own IDs"""
         data_dir = self.get_project_data_path()
         os.makedirs(data_dir, exist_ok=True)
-        with open(os.path.join(data_dir, "processed_ids.json"), "w") as f:
-            json.dump(list(processed_ids), f, indent=2)
+        ids = array.array("I", sorted(new_ids))
+        with open(os.path.join(data_dir, "processed_ids.bin"), "ab") as f:
+            f.write(ids.tobytes())
+
+    def load_user_cache(self):
+        """Load cached user profiles keyed by username, least recently used first, dropping expired entries"""
+        cache_file = os.path.join(self.get_project_data_path(), "users_cache.json")
+        if not os.path.exists(cache_file):
+            return {}
+        try:
+            with open(cache_file, "rb") as f:
+                cache = fast_json.loads(f.read())
+        except ValueError:
+            # A corrupt cache only costs refetching profiles, it must not stop the run
+            print("User cache is unreadable, starting with an empty one")
+            return {}
+        cutoff = time.time() - self.user_cache_ttl
+        return {username: entry for username, entry in cache.items() if entry.get("fetched_at", 0) >= cutoff}
+
+    def save_user_cache(self, user_cache):
+        """Save the most recently used user profiles to disk"""
+        data_dir = self.get_project_data_path()
+        os.makedirs(data_dir, exist_ok=True)
+        recent = dict(list(user_cache.items())[-self.max_cached_users :])
+        cache_file = os.path.join(data_dir, "users_cache.json")
+        # Write a temp file and swap it in, so a run that dies mid-write leaves the previous cache intact
+        with open(f"{cache_file}.tmp", "wb") as f:
+            f.write(fast_json.dumps(recent))
+        os.replace(f"{cache_file}.tmp", cache_file)
 
     async def fetch_batch(self, session, ids_or_names, fetch_func, item_type, batch_size=None):
-        """Generic batch fetcher with concurrency and rate limiting"""
-        bs = batch_size or self.batch_size
-        all_results = []
-        for i in range(0, len(ids_or_names), bs):
-            batch_data = ids_or_names[i : i + bs]
-            tasks = [fetch_func(session, item) for item in batch_data]
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            valid_results = [r for r in batch_results if r and not isinstance(r, Exception)]
-            all_results.extend(valid_results)
-            print(f"  Fetched batch of {len(valid_results)}/{len(batch_data)} {item_type}")
-        return all_results
-
-    async def get_comments_with_metadata(self, session, comment_ids, comments, users, seen_items, seen_users, processed_ids, depth, parent_category):
-        """Recursively fetch comments and authors with batching and depth control"""
-        if depth >= self.max_comment_depth or not comment_ids:
-            return
-
-        new_comment_ids = [cid for cid in comment_ids if cid not in seen_items and cid not in processed_ids]
-        if not new_comment_ids:
+        """Generic concurrent fetcher keeping up to batch_size requests in flight"""
+        semaphore = asyncio.Semaphore(batch_size or self.batch_size)
+
+        async def fetch_one(item):
+            async with semaphore:
+                try:
+                    return await fetch_func(session, item)
+                except Exception:
+                    return None
+
+        results = await asyncio.gather(*(fetch_one(item) for item in ids_or_names))
+        valid_results = [r for r in results if r]
+        print(f"  Fetched {len(valid_results)}/{len(ids_or_names)} {item_type}")
+        return valid_results
+
+    def queue_user(self, pending_users, username, rank, hn_context):
+        """Queue username with hn_context unless it was already queued at an earlier rank (category index, author 0 / commenter 1, depth)"""
+        # Walking all categories at once must not change which context a user gets, so the
+        # category-by-category order (story authors, then commenters by depth) decides, not fetch order
+        if username not in pending_users or rank < pending_users[username][0]:
+            pending_users[username] = (rank, hn_context)
+
+    async def fetch_users(self, session, pending_users, users, user_cache):
+        """Fetch all pending user profiles not in user_cache in one batch and tag each with its recorded context"""
+        if not pending_users:
             return
-
-        print(f"    Fetching {len(new_comment_ids)} comments at depth {depth} in batches...")
-        batch_comments = await self.fetch_batch(session, new_comment_ids, self.ep.get_item, "items")
-
-        comment_authors, child_comment_ids = [], []
-        for comment in batch_comments:
-            if comment and comment.get("type") == "comment":
-                # Add metadata for categorization
-                comment.update(
-                    {
-                        "hn_category": parent_category,
-                        "hn_context": f"comment_on_{parent_category}_story",
-                        "hn_depth": depth,
-                    }
-                )
-                comments.append(comment)
-                seen_items.add(comment["id"])
-
-                if (author := comment.get("by")) and author not in seen_users:
-                    comment_authors.append(author)
-                    seen_users.add(author)  # Limit recursion depth and child count
-                if comment.get("kids") and depth < self.max_comment_depth - 1:
-                    child_comment_ids.extend(comment["kids"][: self.max_child_comments])
-
-        if comment_authors:
-            print(f"    Fetching {len(comment_authors)} commenter profiles in batches...")
-            for user in await self.fetch_batch(session, comment_authors, self.ep.get_user, "user profiles"):
-                if user:
-                    user["hn_context"] = f"commenter_on_{parent_category}"
-                    users.append(user)
-
-        if child_comment_ids and depth < self.max_comment_depth - 1:
-            await self.get_comments_with_metadata(session, child_comment_ids, comments, users, seen_items, seen_users, processed_ids, depth + 1, parent_category)
-
-    async def get_hn_content_with_metadata(self, story_ids_by_category, processed_ids):
+        missing = [username for username in pending_users if username not in user_cache]
+        print(f"  Fetching {len(missing)} user profiles in batches ({len(pending_users) - len(missing)} cached)...")
+        fetched = {}  # Full profiles from this run, emitted as fetched
+        for user in await self.fetch_batch(session, missing, self.ep.get_user, "user profiles"):
+            if user and user.get("id"):
+                fetched[user["id"]] = user
+                # Prolific users have tens of thousands of submissions, only the preview is kept in the cache
+                if "submitted" in user:
+                    user = {**user, "submitted": user["submitted"][:CACHED_SUBMITTED_IDS]}
+                user_cache[user["id"]] = {"fetched_at": time.time(), "user": user}
+
+        # Emit in crawl order, category by category
+        for username, (_, hn_context) in sorted(pending_users.items(), key=lambda pending: pending[1][0]):
+            if (entry := user_cache.pop(username, None)) is not None:
+                user_cache[username] = entry  # Re-insert to mark as most recently used
+                users.append({**fetched.get(username, entry["user"]), "hn_context": hn_context})
+
+    async def get_comments_with_metadata(self, session, comment_categories, comments, pending_users, seen_items, processed_ids, category_order):
+        """Fetch comment trees breadth-first, one batch per depth level across all categories, queueing authors in pending_users"""
+        frontier = comment_categories  # comment ID -> category of the story it belongs to
+        for depth in range(self.max_comment_depth):
+            # Single C-level set difference; sorting keeps HN's chronological ID order
+            new_comment_ids = sorted(frontier.keys() - seen_items - processed_ids)
+            if not new_comment_ids:
+                return
+            # Mark the level as seen before awaiting, so nothing queued meanwhile can request these IDs again
+            seen_items.update(new_comment_ids)
+
+            print(f"    Fetching {len(new_comment_ids)} comments at depth {depth} in batches...")
+            batch_comments = await self.fetch_batch(session, new_comment_ids, self.ep.get_item, "items")
+
+            next_frontier = {}
+            for comment in batch_comments:
+                if comment and comment.get("type") == "comment":
+                    category = frontier[comment["id"]]
+                    # Add metadata for categorization
+                    comment.update(
+                        {
+                            "hn_category": category,
+                            "hn_context": f"comment_on_{category}_story",
+                            "hn_depth": depth,
+                        }
+                    )
+                    comments.append(comment)
+
+                    if author := comment.get("by"):
+                        self.queue_user(pending_users, author, (category_order[category], 1, depth), f"commenter_on_{category}")
+                    # Limit recursion depth and child count
+                    if comment.get("kids") and depth < self.max_comment_depth - 1:
+                        for kid in comment["kids"][: self.max_child_comments]:
+                            next_frontier.setdefault(kid, category)
+
+            frontier = next_frontier
+
+    async def get_hn_content_with_metadata(self, session, story_ids_by_category, processed_ids, user_cache):
         """Fetch comprehensive HN content with metadata"""
         stories, comments, users = [], [], []
-        seen_items, seen_users = set(), set()
-
-        async with aiohttp.ClientSession() as session:
-            for category, story_ids in story_ids_by_category.items():
-                print(f"Processing {category}: {len(story_ids)} stories")
-                new_story_ids = [sid for sid in story_ids if sid not in processed_ids]
-                if not new_story_ids:
-                    print(f"  All {len(story_ids)} stories already processed")
-                    continue
-
-                print(f"  Fetching {len(new_story_ids)} new stories in batches...")
-                batch_stories = await self.fetch_batch(session, new_story_ids, self.ep.get_item, "items")
-
-                story_authors, all_comment_ids = [], []
-                for story in batch_stories:
-                    if story and story.get("type") == "story":  # Add metadata for categorization
-                        story.update({"hn_category": category, "hn_endpoint": category})
-                        stories.append(story)
-                        seen_items.add(story["id"])
-
-                        if (author := story.get("by")) and author not in seen_users:
-                            story_authors.append(author)
-                            seen_users.add(author)
-
-                        if story.get("kids"):
-                            all_comment_ids.extend(story["kids"][: self.max_top_comments])
-
-                if story_authors:
-                    print(f"  Fetching {len(story_authors)} author profiles in batches...")
-                    for user in await self.fetch_batch(session, story_authors, self.ep.get_user, "user profiles"):
-                        if user:
-                            user["hn_context"] = f"author_of_{category}_story"
-                            users.append(user)
-
-                if all_comment_ids:
-                    await self.get_comments_with_metadata(session, all_comment_ids, comments, users, seen_items, seen_users, processed_ids, 0, category)
+        seen_items = set()
+        pending_users = {}  # Story and comment authors -> (rank, context), fetched together once all comment trees are walked
+        category_order = {category: i for i, category in enumerate(story_ids_by_category)}
 
-        return {"stories": stories, "comments": comments, "users": users}
+        # Tag every new story with its category (first category wins) so all categories are fetched in one batch
+        story_categories = {}
+        for category, story_ids in story_ids_by_category.items():
+            for sid in story_ids:
+                if sid not in processed_ids:
+                    story_categories.setdefault(sid, category)
 
-    def fetch_hackernews_data(self):
-        """Main entry point for fetching HN data"""
+        print(f"Fetching {len(story_categories)} new stories across {len(story_ids_by_category)} categories in batches...")
+        batch_stories = await self.fetch_batch(session, list(story_categories), self.ep.get_item, "items")
 
-        async def _fetch():
-            processed_ids = self.load_processed_ids()
-            print(f"Already processed {len(processed_ids)} items")
+        comment_categories = {}
+        for story in batch_stories:
+            if story and story.get("type") == "story":  # Add metadata for categorization
+                category = story_categories[story["id"]]
+                story.update({"hn_category": category, "hn_endpoint": category})
+                stories.append(story)
+                seen_items.add(story["id"])
 
-            all_story_ids = await self.ep.get_all_stories(self.stories_per_category)
+                if author := story.get("by"):
+                    self.queue_user(pending_users, author, (category_order[category], 0, 0), f"author_of_{category}_story")
+
+                for kid in story.get("kids", [])[: self.max_top_comments]:
+                    comment_categories.setdefault(kid, category)
+
+        await self.get_comments_with_metadata(session, comment_categories, comments, pending_users, seen_items, processed_ids, category_order)
+
+        await self.fetch_users(session, pending_users, users, user_cache)
+
+        return {"stories": stories, "comments": comments, "users": users}
+
+    async def fetch_hackernews_data_async(self):
+        """Fetch new HN data inside an already running event loop"""
+        processed_ids = self.load_processed_ids()
+        user_cache = self.load_user_cache()
+        print(f"Already processed {len(processed_ids)} items, {len(user_cache)} user profiles cached")
+
+        # One shared session for the whole run so connections are kept alive across both fetch phases
+        session = await self.ep.get_session()
+        try:
+            all_story_ids = await self.ep.get_all_stories(self.stories_per_category, session)
             new_story_ids_by_category = {}
+            listed_ids = set()  # Stories often appear under several endpoints; the first category wins
             total_new_stories = 0
 
             for category, story_ids in all_story_ids.items():
-                new_ids = [sid for sid in story_ids if sid not in processed_ids]
+                new_ids = [sid for sid in dict.fromkeys(story_ids) if sid not in processed_ids and sid not in listed_ids]
+                listed_ids.update(new_ids)
                 new_story_ids_by_category[category] = new_ids
                 total_new_stories += len(new_ids)
-                print(f"  {category}: {len(new_ids)} new stories, {len(story_ids) - len(new_ids)} already processed")
+                print(f"  {category}: {len(new_ids)} new stories, {len(story_ids) - len(new_ids)} already processed or listed")
 
             print(f"Summary: {total_new_stories} new stories")
             if total_new_stories == 0:
                 print("No new stories to process - everything is up to date!")
                 return []
 
-            data = await self.get_hn_content_with_metadata(new_story_ids_by_category, processed_ids)
-
-            def save_raw_data():
-                data_dir = self.get_project_data_path()
-                os.makedirs(data_dir, exist_ok=True)
+            data = await self.get_hn_content_with_metadata(session, new_story_ids_by_category, processed_ids, user_cache)
+        finally:
+            await self.ep.close_session()
 
-                data["fetch_metadata"] = {
-                    "endpoints_used": list(all_story_ids.keys()),
-                    "stories_per_category": self.stories_per_category,
-                    "max_comment_depth": self.max_comment_depth,
-                    "total_stories_fetched": len(data["stories"]),
-                    "total_comments_fetched": len(data["comments"]),
-                    "total_users_fetched": len(data["users"]),
-                    "fetch_timestamp": asyncio.get_event_loop().time(),
-                }
-
-                with open(os.path.join(data_dir, "hackernews_raw.json"), "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-                print("Raw data saved")
-
-                new_items = data["stories"] + data["comments"] + data["users"]
-                new_ids = {item["id"] for item in new_items if item and item.get("id")}
-                processed_ids.update(new_ids)
-                self.save_processed_ids(processed_ids)
-                print(f"Saved {len(new_items)} items (total tracked: {len(processed_ids)})")
-
-                return new_items
+        data_dir = self.get_project_data_path()
+        os.makedirs(data_dir, exist_ok=True)
 
-            return save_raw_data()
+        data["fetch_metadata"] = {
+            "endpoints_used": list(all_story_ids.keys()),
+            "stories_per_category": self.stories_per_category,
+            "max_comment_depth": self.max_comment_depth,
+            "total_stories_fetched": len(data["stories"]),
+            "total_comments_fetched": len(data["comments"]),
+            "total_users_fetched": len(data["users"]),
+            "fetch_timestamp": time.time(),
+        }
+
+        def write_raw_data():
+            with open(os.path.join(data_dir, "hackernews_raw.json"), "wb") as f:
+                fast_json.dump_streaming(data, f)
+            print("Raw data saved")
+
+        new_items = data["stories"] + data["comments"] + data["users"]
+        # Only numeric item IDs are tracked, user profiles are keyed by username and refreshed through the user cache
+        new_ids = {item["id"] for item in new_items if item and isinstance(item.get("id"), int)} - processed_ids
+        processed_ids.update(new_ids)
+
+        # Serialization and file writes are blocking, run them off the event loop side by side
+        await asyncio.gather(
+            asyncio.to_thread(write_raw_data),
+            asyncio.to_thread(self.save_processed_ids, new_ids),
+            asyncio.to_thread(self.save_user_cache, user_cache),
+        )
+        print(f"Saved {len(new_items)} items (total tracked: {len(processed_ids)})")
+
+        return new_items
 
-        return asyncio.run(_fetch())
+    def fetch_hackernews_data(self):
+        """Main entry point for fetching HN data"""
+        return asyncio.run(self.fetch_hackernews_data_async())
@@ -0,0 +1,38 @@
+"""
+JSON helpers backed by orjson when available, falling back to the stdlib json module.
+All functions work with bytes so files should be opened in binary mode.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, stdlib json is always available
+    orjson = None
+
+
+def loads(data):
+    """Parse JSON from bytes or str"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def dumps(obj):
+    """Serialize obj to compact UTF-8 JSON bytes"""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def dump_streaming(data, f):
+    """Write a dict of lists to a binary file one list item at a time, without building the full JSON in memory"""
+    f.write(b"{")
+    for i, (key, value) in enumerate(data.items()):
+        f.write(b"," if i else b"")
+        f.write(dumps(key) + b":")
+        if isinstance(value, list):
+            f.write(b"[")
+            f.writelines((b"," if j else b"") + dumps(item) for j, item in enumerate(value))
+            f.write(b"]")
+        else:
+            f.write(dumps(value))
+    f.write(b"}")
@@ -3,11 +3,18 @@ HackerNews Data Load class
 Saves formatted documents to disk.
 """
 
-import json
+import logging
 import os
+from pathlib import Path
 
 from .transform import Transformer
 
+# Silent unless the caller configures logging, so frequent appends do no stdout I/O
+logger = logging.getLogger(__name__)
+
+# Resolved once at import rather than on every save
+DEFAULT_OUTPUT_FILE = str(Path(__file__).resolve().parents[2] / "src" / "data" / "hackernews_optimized.txt")
+
 
 class Loader:
     def __init__(self):
@@ -15,50 +22,32 @@ class Loader:
 
     def save_preprocessed_data(self, items, output_file=None, append_mode=False):
         """Save processed HN items to structured text file"""
-        print("Processing HackerNews data...")
+        logger.debug("Processing HackerNews data...")
 
-        if output_file is None:
-            current_file = os.path.abspath(__file__)
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
-            output_file = os.path.join(project_root, "src", "data", "hackernews_optimized.txt")
+        output_file = output_file or DEFAULT_OUTPUT_FILE
 
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        #TODO use format_items_to_documents in Transformer instead
-        documents = []
-        for item in items:
-            if not item:
-                continue
-
-            item_type = item.get("type", "")
-            if item_type == "story":
-                doc_text = self.transformer.format_story(item)
-            elif item_type == "comment":
-                doc_text = self.transformer.format_comment(item)
-            elif "id" in item and "karma" in item:
-                doc_text = self.transformer.format_user(item)
-            else:
-                continue
-
-            if doc_text and doc_text.strip():
-                documents.append(doc_text.strip())
-
-        if not documents:
-            print("No documents to save")
+        # Documents are written as they are formatted, so the corpus is never held in memory as a whole
+        documents = self.transformer.iter_formatted(items)
+        first = next(documents, None)
+        if first is None:
+            logger.info("No documents to save")
             return output_file
 
-        mode = "a" if append_mode and os.path.exists(output_file) else "w"
-        with open(output_file, mode, encoding="utf-8") as f:
-            if append_mode and os.path.exists(output_file):
-                for doc in documents:
-                    f.write(f"\n\n{doc}")
-            else:
-                for i, doc in enumerate(documents):
-                    f.write(doc)
-                    if i < len(documents) - 1:
-                        f.write("\n\n")
-
-        print(f"Done! {len(documents)} documents saved to {output_file}")
+        appending = append_mode and os.path.exists(output_file)
+        count = 1
+        with open(output_file, "ab" if appending else "wb", buffering=1 << 20) as f:
+            # Items are separated by a blank line, so appended items need one before them
+            if appending:
+                f.write(b"\n\n")
+            f.write(first.encode("utf-8"))
+            for doc in documents:
+                f.write(b"\n\n")
+                f.write(doc.encode("utf-8"))
+                count += 1
+
+        logger.info("Done! %d documents saved to %s", count, output_file)
         return output_file
     
 
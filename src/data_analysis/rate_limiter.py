@@ -0,0 +1,69 @@
+"""
+Adaptive concurrency limiter for HackerNews API calls.
+Uses a TCP Vegas style estimate of queued requests to grow or shrink the number of requests in flight.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        initial_limit=10,  # Requests allowed in flight before any latency has been measured
+        min_limit=1,
+        max_limit=32,
+        alpha=3,  # Grow the limit while fewer than alpha requests are estimated to be queued
+        beta=6,  # Shrink the limit once more than beta requests are estimated to be queued
+        rtt_smoothing=0.05,  # Weight of each new sample in the smoothed round trip
+        min_rtt_decay=0.01,  # Share of the gap to the smoothed round trip the baseline recovers per sample
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.alpha = alpha
+        self.beta = beta
+        self.rtt_smoothing = rtt_smoothing
+        self.min_rtt_decay = min_rtt_decay
+        self.in_flight = 0
+        self.min_rtt = None  # Baseline round trip without queueing
+        self.smoothed_rtt = None
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def use(self):
+        """Wait for a free slot, then time the wrapped request and adjust the limit"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+        start, succeeded = time.monotonic(), False
+        try:
+            yield
+            succeeded = True
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._update(time.monotonic() - start, succeeded)
+                self._condition.notify_all()
+
+    def _update(self, rtt, succeeded):
+        """Halve the limit on failures (e.g. HTTP 429), otherwise nudge it towards the Vegas target"""
+        if not succeeded:
+            self.limit = max(self.min_limit, self.limit // 2)
+            return
+
+        # Single samples are too noisy to compare with a minimum, latency jitter would read as queueing
+        self.smoothed_rtt = rtt if self.smoothed_rtt is None else self.smoothed_rtt + (rtt - self.smoothed_rtt) * self.rtt_smoothing
+        # Decaying minimum: follows new lows at once, otherwise drifts back up so one lucky stretch can't pin it
+        if self.min_rtt is None or self.smoothed_rtt < self.min_rtt:
+            self.min_rtt = self.smoothed_rtt
+        else:
+            self.min_rtt += (self.smoothed_rtt - self.min_rtt) * self.min_rtt_decay
+        # Requests queued beyond what the baseline round trip would allow
+        queued = self.limit * (1 - self.min_rtt / self.smoothed_rtt) if self.smoothed_rtt > 0 else 0
+        if queued < self.alpha:
+            self.limit = min(self.max_limit, self.limit + 1)
+        elif queued > self.beta:
+            self.limit = max(self.min_limit, self.limit - 1)
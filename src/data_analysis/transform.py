@@ -1,8 +1,54 @@
+import functools
 import html
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from langchain_core.documents import Document
 
+PARALLEL_MIN_ITEMS = 5000  # Below this, worker start-up costs more than parallel formatting saves
+
+# Compiled once instead of going through re's pattern cache on every call
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+URL_RE = re.compile(r"https?://[^\s\]\)(<>\"]+")
+
+# HN endpoint -> (story_type, content_category); anything else is a general "Story"
+STORY_CATEGORIES = {
+    "askstories": ("Ask HN", "ask_hn"),
+    "showstories": ("Show HN", "show_hn"),
+    "jobstories": ("Job Posting", "jobs"),
+    "beststories": ("Best Story", "best"),
+}
+
+
+def _flag_tags(names):
+    """Render every bitmask over names as the ", name" suffix of the tags whose bits are set"""
+    return tuple("".join(f", {name}" for i, name in enumerate(names) if mask >> i & 1) for mask in range(1 << len(names)))
+
+
+# Threshold-driven tags are a closed set, so items index a prerendered suffix by bitmask instead of building a list
+STORY_FLAG_TAGS = _flag_tags(("popular", "highly_popular", "discussion_heavy"))
+USER_FLAG_TAGS = _flag_tags(("high_karma_user", "content_author", "active_commenter"))
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_minute(minute):
+    """Local "YYYY-MM-DD HH:MM" for a Unix time in whole minutes; many HN items share a minute"""
+    return datetime.fromtimestamp(minute * 60).strftime("%Y-%m-%d %H:%M")
+
+
+def format_timestamp(timestamp, with_time=True):
+    """Format a Unix timestamp as local date and time (or date only), "Unknown" if missing"""
+    if not timestamp:
+        return "Unknown"
+    formatted = _format_minute(int(timestamp) // 60)
+    return formatted if with_time else formatted[:10]
+
+
+def _format_chunk(items):
+    """Format one shard of items in a worker process"""
+    return Transformer().format_items(items, parallel=False)
+
 
 class Transformer:
     def __init__(self):
@@ -11,21 +57,33 @@ class Transformer:
         self.HIGHLY_POPULAR_THRESHOLD = 500
         self.DISCUSSION_HEAVY_THRESHOLD = 50
         self.HIGH_KARMA_THRESHOLD = 1000
+        # Item kind -> formatter, one dict lookup per item instead of an if/elif chain
+        self.formatters = {"story": self.format_story, "comment": self.format_comment, "user": self.format_user}
+
+    def item_kind(self, item):
+        """Return "story", "comment" or "user" for a raw HN item, None if unsupported"""
+        kind = item.get("type")
+        if kind in self.formatters:
+            return kind
+        # User profiles from the HN API have no type field
+        return "user" if "id" in item and "karma" in item else None
 
     def extract_urls_from_text(self, text):
-        """Extract URLs from text"""
-        if not text:
+        """Extract unique URLs from text, in order of first appearance"""
+        # Most comments have no links, a substring check is far cheaper than a regex scan
+        if not text or "http" not in text:
             return []
-        pattern = r"https?://[^\s\]\)(<>\"]+"
-        return list(set(re.findall(pattern, text)))
+        return list(dict.fromkeys(URL_RE.findall(text)))
 
     def clean_text(self, text):
         """Clean HTML and normalize whitespace"""
         if not text:
             return ""
-        text = re.sub(r"<[^>]+>", "", text)
-        text = html.unescape(text)
-        return re.sub(r"\s+", " ", text).strip()
+        if "<" in text:
+            text = HTML_TAG_RE.sub("", text)
+        text = html.unescape(text)  # Returns early when there is no "&"
+        # str.split() breaks on the same characters as \s and drops the ends, so this collapses and strips in one C pass
+        return " ".join(text.split())
 
     def format_story(self, story):
         """Format HN story into structured document"""
@@ -41,20 +99,14 @@ class Transformer:
         comment_ids = story.get("kids", [])
         comment_count = len(comment_ids)
         timestamp = story.get("time", 0)
-        date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else "Unknown"
+        date = format_timestamp(timestamp)
         hn_category = story.get("hn_category", "topstories")
 
-        # Determine story type
-        if hn_category == "askstories" or title.startswith("Ask HN:"):
-            story_type, content_category = "Ask HN", "ask_hn"
-        elif hn_category == "showstories" or title.startswith("Show HN:"):
-            story_type, content_category = "Show HN", "show_hn"
-        elif hn_category == "jobstories":
-            story_type, content_category = "Job Posting", "jobs"
-        elif hn_category == "beststories":
-            story_type, content_category = "Best Story", "best"
-        else:
-            story_type, content_category = "Story", "general"
+        # Determine story type, "Ask HN:"/"Show HN:" titles take precedence over other endpoints
+        category_key = hn_category
+        if hn_category != "askstories" and title.startswith(("Ask HN:", "Show HN:")):
+            category_key = "askstories" if title.startswith("Ask HN:") else "showstories"
+        story_type, content_category = STORY_CATEGORIES.get(category_key, ("Story", "general"))
 
         parts = [
             f"Metadata: type=story, category={content_category}",
@@ -81,15 +133,8 @@ class Transformer:
                 parts.append(f"Extracted URLs: {', '.join(urls)}")
 
         # Add tags
-        tags = [content_category, "story"]
-        if score > self.POPULAR_SCORE_THRESHOLD:
-            tags.append("popular")
-        if score > self.HIGHLY_POPULAR_THRESHOLD:
-            tags.append("highly_popular")
-        if comment_count > self.DISCUSSION_HEAVY_THRESHOLD:
-            tags.append("discussion_heavy")
-
-        parts.append(f"Tags: {', '.join(tags)}")
+        flags = (score > self.POPULAR_SCORE_THRESHOLD) | (score > self.HIGHLY_POPULAR_THRESHOLD) << 1 | (comment_count > self.DISCUSSION_HEAVY_THRESHOLD) << 2
+        parts.append(f"Tags: {content_category}, story{STORY_FLAG_TAGS[flags]}")
         return "\n".join(parts)
 
     def format_comment(self, comment):
@@ -101,7 +146,7 @@ class Transformer:
         author = comment.get("by", "Unknown")
         text = self.clean_text(comment.get("text", ""))
         timestamp = comment.get("time", 0)
-        date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else "Unknown"
+        date = format_timestamp(timestamp)
         hn_category = comment.get("hn_category", "general")
         hn_context = comment.get("hn_context", "comment")
         hn_depth = comment.get("hn_depth", 0)
@@ -134,9 +179,7 @@ class Transformer:
             parts.append("Text: [Deleted or empty]")
 
         # Tags
-        tags = [hn_category, "comment"]
-        tags.append("top_level_comment" if hn_depth == 0 else "reply")
-        parts.append(f"Tags: {', '.join(tags)}")
+        parts.append(f"Tags: {hn_category}, comment, {'top_level_comment' if hn_depth == 0 else 'reply'}")
 
         return "\n".join(parts)
 
@@ -149,15 +192,19 @@ class Transformer:
         karma = user.get("karma", 0)
         created = user.get("created", 0)
         about = self.clean_text(user.get("about", ""))
-        created_date = datetime.fromtimestamp(created).strftime("%Y-%m-%d") if created else "Unknown"
+        created_date = format_timestamp(created, with_time=False)
         hn_context = user.get("hn_context", "user_profile")
 
+        # Shared by the description and the tags
+        is_high_karma = karma > self.HIGH_KARMA_THRESHOLD
+        is_commenter = "commenter" in hn_context
+
         # Add description field
-        if karma > self.HIGH_KARMA_THRESHOLD:
+        if is_high_karma:
             user_desc = "High Karma User"
         elif "author_of" in hn_context:
             user_desc = "Content Author"
-        elif "commenter" in hn_context:
+        elif is_commenter:
             user_desc = "Active Commenter"
         else:
             user_desc = "Hacker News User"
@@ -185,33 +232,43 @@ class Transformer:
             parts.append(f"Submitted IDs: {preview_str}")
 
         # Tags
-        tags = ["user_profile"]
-        if karma > self.HIGH_KARMA_THRESHOLD:
-            tags.append("high_karma_user")
-        if "author" in hn_context:
-            tags.append("content_author")
-        if "commenter" in hn_context:
-            tags.append("active_commenter")
-        parts.append(f"Tags: {', '.join(tags)}")
+        flags = is_high_karma | ("author" in hn_context) << 1 | is_commenter << 2
+        parts.append(f"Tags: user_profile{USER_FLAG_TAGS[flags]}")
 
         return "\n".join(parts)
 
+    def iter_formatted(self, items, parallel=True):
+        """Yield non-empty document texts for raw HackerNews JSON items, sharded across processes for large inputs"""
+        workers = os.cpu_count() or 1
+        if parallel and workers > 1 and len(items) >= PARALLEL_MIN_ITEMS:
+            shard_size = -(-len(items) // workers)
+            shards = [items[i : i + shard_size] for i in range(0, len(items), shard_size)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for texts in executor.map(_format_chunk, shards):
+                    yield from texts
+            return
+
+        for item in items:
+            if not item or not (kind := self.item_kind(item)):
+                continue
+            # Formatters start with "Metadata:" and end with "Tags:", so there is nothing to strip
+            if text := self.formatters[kind](item):
+                yield text
+
+    def format_items(self, items, parallel=True) -> list[str]:
+        """Format raw HackerNews JSON items into non-empty document texts"""
+        return list(self.iter_formatted(items, parallel))
+
     def format_items_to_documents(self, new_items) -> list[Document]:
         """
         Convert raw HackerNews JSON items into langchain Documents.
         """
         docs = []
         for item in new_items:
-            t = item.get("type")
-            if t == "story":
-                text = self.format_story(item)
-            elif t == "comment":
-                text = self.format_comment(item)
-            elif t == "user":
-                text = self.format_user(item)
-            else:
+            if not item or not (kind := self.item_kind(item)):
                 continue
 
+            text = self.formatters[kind](item)
             if not text:
                 continue
 
@@ -221,8 +278,8 @@ class Transformer:
                     metadata={
                         "source": "hackernews.com",
                         "item_id": item.get("id"),
-                        "item_type": t,
-                        "author": item.get("by", "unknown"),
+                        "item_type": kind,
+                        "author": item.get("id") if kind == "user" else item.get("by", "unknown"),
                     },
                 )
             )
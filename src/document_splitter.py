@@ -4,52 +4,67 @@ import re
 
 CHUNK_SIZE = 800  # TODO: test different chunk sizes for optimal retrieval
 CHUNK_OVERLAP = 80  # TODO: play with chunk overlap for better context
+TYPE_RE = re.compile(r"type=(\w+)")  # compiled once, probed on every block's Metadata line
 
 
-def load_document(path: str) -> list[Document]:
-    """Load HN export as one Document per item, carrying through its type, id & author."""
-    text = open(path, encoding="utf-8").read()
-    blocks = text.split("\n\n")  # each HN item (story/comment/user) is separated by a blank line
+def _block_to_document(lines: list[str], path: str) -> Document:
+    """Build the Document for one HN item from its lines, carrying through its type, id & author."""
+    # parse the Metadata line to get the type
+    # e.g. "Metadata: type=story, category=ask_hn"
+    m = TYPE_RE.search(lines[0])
+    item_type = m.group(1) if m else "unknown"
+
+    # parse ID and author/username
+    item_id = None
+    author = None
+    for L in lines:
+        if L.startswith(("Story ID:", "Comment ID:")):
+            item_id = L.split(":",1)[1].strip()
+        elif L.startswith(("Username:", "Author:")):
+            author = L.split(":",1)[1].strip()
+
+    # fall back if we didn’t find them
+    item_id = item_id or "unknown"
+    author  = author  or "unknown"
 
+    return Document(
+        page_content="\n".join(lines),
+        metadata={
+            "source": path,
+            "item_type": item_type,
+            "item_id": item_id,
+            "author": author,
+        },
+    )
+
+
+def load_document(path: str) -> list[Document]:
+    """Load HN export as one Document per item, streaming the file line by line."""
     docs = []
-    for block in blocks:
-        lines = block.splitlines()
-        if not lines:
-            continue
-
-        # parse the Metadata line to get the type
-        # e.g. "Metadata: type=story, category=ask_hn"
-        m = re.search(r"type=(\w+)", lines[0])
-        item_type = m.group(1) if m else "unknown"
-
-        # parse ID and author/username
-        item_id = None
-        author = None
-        for L in lines:
-            if L.startswith("Story ID:") or L.startswith("Comment ID:"):
-                item_id = L.split(":",1)[1].strip()
-            if L.startswith("Username:") or L.startswith("Author:"):
-                author = L.split(":",1)[1].strip()
-
-        # fall back if we didn’t find them
-        item_id = item_id or "unknown"
-        author  = author  or "unknown"
-
-        docs.append(
-            Document(
-                page_content=block,
-                metadata={
-                    "source": path,
-                    "item_type": item_type,
-                    "item_id": item_id,
-                    "author": author,
-                },
-            )
-        )
+    lines = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            # each HN item (story/comment/user) is separated by a blank line
+            if line == "\n":
+                if lines:
+                    docs.append(_block_to_document(lines, path))
+                    lines = []
+            else:
+                lines.append(line.rstrip("\n"))
+    if lines:
+        docs.append(_block_to_document(lines, path))
     return docs
 
 
 def split_documents(docs: list[Document]) -> list[Document]:
     """Split documents into chunks for embedding and retrieval"""
     # TODO: test different text splitters for HackerNews content
-    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function=len).split_documents(docs)
+    # Most HN items already fit in one chunk, and the splitter would return them unchanged, so only long items go through it
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function=len)
+    chunks = []
+    for doc in docs:
+        if len(doc.page_content) > CHUNK_SIZE:
+            chunks.extend(splitter.split_documents([doc]))
+        else:
+            chunks.append(doc)
+    return chunks
@@ -1,3 +1,4 @@
+import functools
 import os
 
 from dotenv import find_dotenv, load_dotenv
@@ -8,8 +9,9 @@ LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME")  # TODO: test other models like lla
 print("Loading Ollama model:", LLM_MODEL_NAME)
 
 
+@functools.lru_cache(maxsize=1)
 def get_llm():
-    """Initialize OllamaLLM client with optimized parameters"""
+    """Initialize OllamaLLM client with optimized parameters (created once per process)"""
     return OllamaLLM(
         model=LLM_MODEL_NAME,
         temperature=0.1,  # Low temperature for consistent answers
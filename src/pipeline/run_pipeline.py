@@ -1,5 +1,6 @@
 """HackerNews RAG Pipeline"""
 
+import logging
 import os
 import traceback
 
@@ -60,4 +61,10 @@ def main():
 
 
 if __name__ == "__main__":
+    # Show this project's progress logs only, third-party loggers stay at the root's WARNING level
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    project_logger = logging.getLogger("src")
+    project_logger.setLevel(logging.INFO)
+    project_logger.addHandler(handler)
     print("Pipeline completed successfully!" if main() else "Pipeline failed")
\ No newline at end of file
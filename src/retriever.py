@@ -1,5 +1,6 @@
 """HackerNews Document Retriever"""
 
+import functools
 import os
 
 from dotenv import find_dotenv, load_dotenv
@@ -13,8 +14,9 @@ load_dotenv(find_dotenv(), override=True)
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "hackernews_optimized.txt")
 
 
+@functools.lru_cache(maxsize=1)
 def get_retriever():
-    """Create optimized retriever for HackerNews knowledge base"""
+    """Create optimized retriever for HackerNews knowledge base (built once per process)"""
     # Check if data file exists when function is called, not at import time
     if not os.path.exists(DATA_PATH):
         raise FileNotFoundError(f"HackerNews data file not found at: {DATA_PATH}")
@@ -1,5 +1,4 @@
 import os
-import pickle
 
 from langchain_community.vectorstores import FAISS
 